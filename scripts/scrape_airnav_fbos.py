@@ -6,15 +6,37 @@ Fetches FBO data from AirNav.com for specified airports.
 Usage:
     python3 scrape_airnav_fbos.py
 
+Requires: Python 3.10+ and aiohttp (pip install aiohttp)
+
 Output: propilot_fbos.csv in the project root directory
 """
 
+import asyncio
 import csv
+import functools
+import operator
 import random
 import re
-import time
-import urllib.request
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Optional
+
+import aiohttp
+
+# Optional: google-re2 (pip install google-re2) matches in guaranteed linear
+# time, which is nice insurance when running character-class patterns over
+# untrusted HTML. Drop-in for search/split, so fall back to stdlib re.
+try:
+    import re2 as re_engine
+except ImportError:
+    re_engine = re
+
+# Optional: selectolax (pip install selectolax) wraps the Lexbor HTML parser
+# in C. Parsing the FBO section once and walking real <tr> nodes beats
+# regex-splitting the whole blob; without it we fall back to the regex path.
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
 
 # Rotate user agents to look more natural
 USER_AGENTS = [
@@ -59,182 +81,275 @@ NAME_BLACKLIST = [
 ]
 
 
-def fetch_url(url: str, retry_count: int = 3) -> str:
-    """Fetch URL content with proper headers and retry logic"""
-    headers = {
-        'User-Agent': random.choice(USER_AGENTS),
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'identity',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
+@dataclass(slots=True)
+class FBO:
+    """One scraped FBO row - slots keep hundreds of these cheap to hold"""
+    airport_code: str
+    name: str
+    phone: str = ''
+    unicom: str = ''
+    # Never parsed, but stays a column: AirportDatabaseManager reads the CSV
+    # positionally with website at index 4
+    website: str = ''
+    jet_a_price: str = ''
+    avgas_price: str = ''
+    crew_cars: str = 'Unknown'
+    crew_lounge: str = 'Yes'
+    catering: str = 'Unknown'
+    maintenance: str = 'Unknown'
+    hangars: str = 'Unknown'
+    deice: str = 'Unknown'
+    oxygen: str = 'Unknown'
+    gpu: str = 'Unknown'
+    lav: str = 'Unknown'
+    handling_fee: str = ''
+    overnight_fee: str = ''
+    ramp_fee: str = ''
+    ramp_fee_waived: str = 'Unknown'
+
+
+# Pre-compiled patterns - these run several times per FBO row, so compile
+# once at import instead of going through re's cache lookup on every call
+
+# Case-insensitivity is spelled inline as (?i): google-re2 exposes no
+# re-style flag constants, so flags arguments would break under that engine
+
+# One alternation over all blacklist entries - a single pass over the name
+# instead of 25 separate lower()+substring scans
+BLACKLIST_RE = re_engine.compile('(?i)' + '|'.join(re.escape(b) for b in NAME_BLACKLIST))
+
+ROW_RE = re_engine.compile(r'<TR[^>]*valign=middle[^>]*>')
+# Tag/attribute matches are case-insensitive: the tree parser re-serializes
+# AirNav's uppercase tags as lowercase
+MORE_INFO_RE = re_engine.compile(r'(?i)More info[^<]*about ([^<]+)</FONT>')
+PHONE_RE = re_engine.compile(r'(\d{3}[-.]?\d{3}[-.]?\d{4})')
+EMAIL_RE = re_engine.compile(r'mailto:([^?"]+)')
+ASRI_RE = re_engine.compile(r'ASRI ([0-9.]+)')
+# Airport-agnostic: capture the code and verify it in Python, so one compiled
+# pattern serves every airport
+HREF_RE = re_engine.compile(r'href="/airport/([A-Z0-9]+)/([A-Z0-9_]+)"')
+
+
+@functools.lru_cache(maxsize=None)
+def _logo_re(fbo_id: str):
+    """Compiled logo-image pattern for one FBO id (cached, same reason)"""
+    return re_engine.compile(r'(?i)<IMG src="[^"]+/lc/' + fbo_id + r'/[^"]*"[^>]*alt="([^"]+)"')
+
+
+# Concurrency knobs - stay polite so AirNav doesn't 429 us
+MAX_CONCURRENT = 8
+LIMIT_PER_HOST = 2
+
+# Exponential backoff base per retry attempt, capped at 60s and computed once;
+# jitter is added at use
+RETRY_COUNT = 3
+_BACKOFF_SCHEDULE = tuple(min(60.0, float(2 ** attempt)) for attempt in range(RETRY_COUNT))
+
+
+def _backoff_seconds(response, attempt: int) -> float:
+    """Wait time before the next request: Retry-After if sent, else schedule + jitter"""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return min(60.0, float(retry_after))
+        except ValueError:
+            pass  # HTTP-date form; fall through to the computed schedule
+    base = _BACKOFF_SCHEDULE[min(attempt, RETRY_COUNT - 1)]
+    return min(60.0, base + random.random())
+
 
+async def fetch_url(session: aiohttp.ClientSession, url: str, retry_count: int = RETRY_COUNT) -> str:
+    """Fetch URL content with proper headers and retry logic"""
     for attempt in range(retry_count):
-        req = urllib.request.Request(url, headers=headers)
         try:
-            with urllib.request.urlopen(req, timeout=30) as response:
+            async with session.get(
+                url,
+                headers={'User-Agent': random.choice(USER_AGENTS)},
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
                 if response.status == 200:
-                    return response.read().decode('utf-8', errors='ignore')
-        except urllib.error.HTTPError as e:
-            if e.code == 429:
-                wait_time = (attempt + 1) * 30
-                print(f"  Rate limited (429)! Waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-            elif e.code == 403:
-                print(f"  Blocked (403)!")
-                return ""
-            else:
-                print(f"  HTTP Error {e.code}")
+                    text = await response.text(errors='ignore')
+                    remaining = response.headers.get('X-RateLimit-Remaining')
+                    if remaining and remaining.isdigit() and int(remaining) <= 1:
+                        # Nearly out of quota - pause so the pool doesn't trip 429
+                        await asyncio.sleep(_backoff_seconds(response, attempt))
+                    return text
+                elif response.status == 429:
+                    wait_time = _backoff_seconds(response, attempt)
+                    print(f"  Rate limited (429)! Waiting {wait_time:.1f}s...")
+                    await asyncio.sleep(wait_time)
+                    continue
+                elif response.status == 403:
+                    print(f"  Blocked (403)!")
+                    return ""
+                else:
+                    print(f"  HTTP Error {response.status}")
         except Exception as e:
             print(f"  Error: {e}")
 
         if attempt < retry_count - 1:
-            time.sleep(5)
+            await asyncio.sleep(5)
 
     return ""
 
 
-def scrape_airport(airport: str) -> List[Dict]:
+async def scrape_airport(session: aiohttp.ClientSession, sem: asyncio.Semaphore, airport: str,
+                         seen_fbos: set) -> List[FBO]:
     """Scrape FBO data for a single airport"""
     url = f"https://www.airnav.com/airport/{airport}"
-    html = fetch_url(url)
+    async with sem:
+        # Rate limiting - randomized to look more human
+        await asyncio.sleep(random.uniform(2.0, 4.0))
+        html = await fetch_url(session, url)
     if not html:
         return []
 
-    fbos = []
+    if HTMLParser is not None:
+        return _parse_fbos_tree(html, airport, seen_fbos)
+    return _parse_fbos_regex(html, airport, seen_fbos)
 
-    # Find FBO section
+
+def _fbo_section_bounds(html: str) -> tuple:
+    """Locate the 'FBO, Fuel Providers' section, returning (start, end) or (-1, -1)"""
     fbo_start = html.find('FBO, Fuel Providers')
     if fbo_start < 0:
-        return fbos
+        return -1, -1
 
     next_section = html.find('<H3>', fbo_start + 100)
     if next_section < 0:
         next_section = len(html)
 
-    fbo_section = html[fbo_start:next_section]
-
-    # Split into rows - each FBO is in a TR with valign=middle
-    rows = re.split(r'<TR[^>]*valign=middle[^>]*>', fbo_section)
-
-    seen_fbos = set()  # Track by email to avoid duplicates
-
-    for row in rows[1:]:  # Skip header
-        # Get FBO ID from href pattern
-        id_match = re.search(r'href="/airport/' + airport + r'/([A-Z0-9_]+)"', row)
-        if not id_match:
-            continue
-        fbo_id = id_match.group(1)
-        if '#' in fbo_id or 'comment' in fbo_id.lower() or 'link' in fbo_id.lower():
-            continue
-
-        # Try multiple methods to get the FBO name
-        name = None
-
-        # Method 1: Look for "More info about {FBO Name}"
-        more_info = re.search(r'More info[^<]*about ([^<]+)</FONT>', row)
-        if more_info:
-            name = more_info.group(1).strip()
-
-        # Method 2: Look for 240x60 logo image with alt text
-        if not name:
-            img_match = re.search(r'<IMG src="[^"]+/lc/' + fbo_id + r'/[^"]*"[^>]*alt="([^"]+)"', row)
-            if img_match:
-                candidate = img_match.group(1).strip()
-                if not any(b.lower() in candidate.lower() for b in NAME_BLACKLIST):
-                    name = candidate
-
-        # Method 3: Use cleaned FBO ID
-        if not name:
-            name = fbo_id.replace('_', ' ').title()
-            # Expand common abbreviations
-            name = name.replace(' Av', ' Aviation').replace(' E', ' East').replace(' W', ' West').replace(' S', ' South')
-
-        # Skip if name matches blacklist
-        if any(b.lower() in name.lower() for b in NAME_BLACKLIST):
-            continue
-
-        if len(name) < 4:
-            continue
-
-        # Get phone
-        phone_match = re.search(r'(\d{3}[-.]?\d{3}[-.]?\d{4})', row)
-        phone = phone_match.group(1) if phone_match else ''
-
-        # Get email
-        email_match = re.search(r'mailto:([^?"]+)', row)
-        email = email_match.group(1) if email_match else ''
-
-        # Skip duplicates (same email at same airport)
-        fbo_key = f"{airport}:{email}" if email else f"{airport}:{name}"
-        if fbo_key in seen_fbos:
-            continue
-        seen_fbos.add(fbo_key)
-
-        # Get ASRI frequency
-        asri_match = re.search(r'ASRI ([0-9.]+)', row)
-        asri = asri_match.group(1) if asri_match else ''
-
-        fbos.append({
-            'airport_code': airport,
-            'name': name,
-            'phone': phone,
-            'unicom': asri,
-            'website': '',  # Could parse if needed
-            'email': email,
-            'jet_a_price': '',
-            'avgas_price': '',
-            'crew_cars': 'Unknown',
-            'crew_lounge': 'Yes',
-            'catering': 'Unknown',
-            'maintenance': 'Unknown',
-            'hangars': 'Unknown',
-            'deice': 'Unknown',
-            'oxygen': 'Unknown',
-            'gpu': 'Unknown',
-            'lav': 'Unknown',
-            'handling_fee': '',
-            'overnight_fee': '',
-            'ramp_fee': '',
-            'ramp_fee_waived': 'Unknown'
-        })
+    return fbo_start, next_section
+
+
+def _parse_fbos_tree(html: str, airport: str, seen_fbos: set) -> List[FBO]:
+    """Parse FBO rows by walking the HTML tree (selectolax fast path)"""
+    start, end = _fbo_section_bounds(html)
+    if start < 0:
+        return []
+
+    # Wrap the slice in a synthetic <table>: AirNav's table opens before the
+    # section heading, so the slice starts mid-table and a spec-compliant
+    # parser would otherwise drop the orphaned <tr> elements
+    tree = HTMLParser('<table>' + html[start:end])
+    fbos = []
+
+    # Each FBO is in a TR with valign=middle
+    for tr in tree.css('tr[valign="middle"]'):
+        fbo = _extract_fbo(tr.html or '', airport, seen_fbos)
+        if fbo is not None:
+            fbos.append(fbo)
 
     return fbos
 
 
-def main():
-    """Main scraper function"""
-    all_fbos = []
+def _parse_fbos_regex(html: str, airport: str, seen_fbos: set) -> List[FBO]:
+    """Parse FBO rows with regex matching (fallback when selectolax is absent)"""
+    start, end = _fbo_section_bounds(html)
+    if start < 0:
+        return []
 
-    print("=" * 60)
-    print("AirNav FBO Scraper")
-    print("=" * 60)
-    print(f"Scraping {len(AIRPORTS)} airports...")
-    print()
+    # Each FBO is in a TR with valign=middle. Walk the row markers in place
+    # with pos/endpos bounds - no section-sized substring copy, and each row
+    # is sliced only between its marker and the next
+    marks = list(ROW_RE.finditer(html, start, end))
 
-    for i, airport in enumerate(AIRPORTS):
-        print(f"[{i+1}/{len(AIRPORTS)}] Fetching {airport}...", end=" ")
-        fbos = scrape_airport(airport)
-        all_fbos.extend(fbos)
-        print(f"Found {len(fbos)} FBOs")
+    fbos = []
 
-        # Rate limiting - randomized to look more human
-        if i < len(AIRPORTS) - 1:
-            delay = random.uniform(2.0, 4.0)
-            time.sleep(delay)
+    for i, mark in enumerate(marks):
+        row_end = marks[i + 1].start() if i + 1 < len(marks) else end
+        fbo = _extract_fbo(html[mark.end():row_end], airport, seen_fbos)
+        if fbo is not None:
+            fbos.append(fbo)
 
-        # Progress update every 20 airports
-        if (i + 1) % 20 == 0:
-            print(f"  === Progress: {i + 1}/{len(AIRPORTS)} airports, {len(all_fbos)} total FBOs ===")
+    return fbos
 
-    print()
+
+def _extract_fbo(row: str, airport: str, seen_fbos: set) -> Optional[FBO]:
+    """Extract one FBO record from a table-row fragment, or None to skip it"""
+    # Get FBO ID from href pattern
+    id_match = HREF_RE.search(row)
+    if not id_match or id_match.group(1) != airport:
+        return None
+    fbo_id = id_match.group(2)
+    fbo_id_lc = fbo_id.lower()
+    if '#' in fbo_id or 'comment' in fbo_id_lc or 'link' in fbo_id_lc:
+        return None
+
+    # Try multiple methods to get the FBO name
+    name = None
+
+    # Method 1: Look for "More info about {FBO Name}"
+    # (cheap literal 'in' checks gate the regexes below - most rows that lack
+    # the literal can skip the engine entirely)
+    more_info = MORE_INFO_RE.search(row) if 'More info' in row else None
+    if more_info:
+        name = more_info.group(1).strip()
+
+    # Method 2: Look for 240x60 logo image with alt text
+    if not name:
+        img_match = _logo_re(fbo_id).search(row)
+        if img_match:
+            candidate = img_match.group(1).strip()
+            if not BLACKLIST_RE.search(candidate):
+                name = candidate
+
+    # Method 3: Use cleaned FBO ID
+    if not name:
+        name = fbo_id.replace('_', ' ').title()
+        # Expand common abbreviations
+        name = name.replace(' Av', ' Aviation').replace(' E', ' East').replace(' W', ' West').replace(' S', ' South')
+
+    # Skip if name matches blacklist
+    if BLACKLIST_RE.search(name):
+        return None
+
+    if len(name) < 4:
+        return None
+
+    # Get phone
+    phone_match = PHONE_RE.search(row)
+    phone = phone_match.group(1) if phone_match else ''
+
+    # Get email
+    email_match = EMAIL_RE.search(row) if 'mailto:' in row else None
+    email = email_match.group(1) if email_match else ''
+
+    # Skip duplicates (same email at same airport); the set is shared across
+    # airports so chain FBOs only ever carry per-airport entries once
+    fbo_key = (airport, email or name)
+    if fbo_key in seen_fbos:
+        return None
+    seen_fbos.add(fbo_key)
+
+    # Get ASRI frequency
+    asri_match = ASRI_RE.search(row) if 'ASRI ' in row else None
+    asri = asri_match.group(1) if asri_match else ''
+
+    return FBO(airport_code=airport, name=name, phone=phone, unicom=asri)
+
+
+async def main():
+    """Main scraper function"""
     print("=" * 60)
-    print(f"Total FBOs found: {len(all_fbos)}")
+    print("AirNav FBO Scraper")
     print("=" * 60)
+    print(f"Scraping {len(AIRPORTS)} airports ({MAX_CONCURRENT} concurrent)...")
+    print()
+
+    headers = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        # gzip/deflate cuts the HTML payload 3-5x; aiohttp decompresses for us
+        'Accept-Encoding': 'gzip, deflate',
+        'Upgrade-Insecure-Requests': '1',
+    }
+    # One pooled session for the whole run: connections to airnav.com are
+    # kept alive and reused, so we pay the TCP+TLS handshake only a couple
+    # of times instead of once per airport.
+    connector = aiohttp.TCPConnector(limit=16, limit_per_host=LIMIT_PER_HOST)
+    sem = asyncio.Semaphore(MAX_CONCURRENT)
 
-    # Write to CSV
     output_file = "../propilot_fbos.csv"
     fieldnames = [
         'airport_code', 'name', 'phone', 'unicom', 'website',
@@ -243,17 +358,44 @@ def main():
         'gpu', 'lav', 'handling_fee', 'overnight_fee', 'ramp_fee', 'ramp_fee_waived'
     ]
 
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for fbo in all_fbos:
-            # Only write fields that match our schema
-            row = {k: fbo.get(k, '') for k in fieldnames}
-            writer.writerow(row)
+    # FBO fields map 1:1 onto the CSV schema; attrgetter builds each row tuple in C
+    as_row = operator.attrgetter(*fieldnames)
+
+    # Dedupe across the whole run (single event loop, so no lock needed)
+    seen_fbos = set()
+
+    async def run_one(airport: str):
+        try:
+            return airport, await scrape_airport(session, sem, airport, seen_fbos)
+        except Exception as e:
+            print(f"  {airport}: failed ({e})")
+            return airport, []
+
+    total = 0
+    # Stream rows out as each airport finishes - nothing buffers in memory,
+    # and a crash mid-run still leaves the completed airports on disk
+    # 1 MiB buffer: batch the many small row writes into few syscalls
+    with open(output_file, 'w', newline='', encoding='utf-8', buffering=1024 * 1024) as f:
+        # Plain csv.writer skips DictWriter's per-field dict-to-list step;
+        # writerows consumes the row generators in one C-level loop
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+
+        async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+            for future in asyncio.as_completed([run_one(a) for a in AIRPORTS]):
+                airport, fbos = await future
+                print(f"  {airport}: {len(fbos)} FBOs")
+                writer.writerows(as_row(fbo) for fbo in fbos)
+                total += len(fbos)
+
+    print()
+    print("=" * 60)
+    print(f"Total FBOs found: {total}")
+    print("=" * 60)
 
-    print(f"\nWrote {len(all_fbos)} FBOs to {output_file}")
+    print(f"\nWrote {total} FBOs to {output_file}")
     print("Done!")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
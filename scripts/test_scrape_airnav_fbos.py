@@ -0,0 +1,56 @@
+"""Tests for the AirNav FBO scraper's parsing paths.
+
+Usage:
+    python3 -m pytest scripts/test_scrape_airnav_fbos.py
+
+The fixture is a saved-style AirNav airport page where the FBO table opens
+before the section heading, the layout that breaks naive fragment parsing.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+# The scraper needs aiohttp to fetch, but the parsing code under test does
+# not; satisfy the module-scope import when the wheel isn't installed.
+try:
+    import aiohttp  # noqa: F401
+except ImportError:
+    _stub = types.ModuleType('aiohttp')
+    _stub.ClientSession = _stub.ClientTimeout = _stub.TCPConnector = object
+    sys.modules['aiohttp'] = _stub
+
+sys.path.insert(0, str(Path(__file__).parent))
+import scrape_airnav_fbos as scraper  # noqa: E402
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'airnav_fbo_section.html'
+
+
+def test_parse_fbos_regex():
+    """Regex path: real FBOs kept, badge/blacklist and duplicate-email rows dropped"""
+    fbos = scraper._parse_fbos_regex(FIXTURE.read_text(), 'KTEB', set())
+
+    assert [f.name for f in fbos] == ['Signature Flight Support East', 'Atlantic Aviation']
+    assert fbos[0].phone == '201-555-1212'
+    assert fbos[0].unicom == '122.95'
+    assert fbos[1].phone == '201-555-3434'
+
+
+def test_parse_fbos_wrong_airport():
+    """Rows for another airport's hrefs must not match"""
+    assert scraper._parse_fbos_regex(FIXTURE.read_text(), 'KLAX', set()) == []
+
+
+def test_tree_path_matches_regex_path():
+    """The selectolax fast path must produce exactly what the regex path does"""
+    if scraper.HTMLParser is None:
+        pytest.skip('selectolax not installed')
+
+    html = FIXTURE.read_text()
+    tree_fbos = scraper._parse_fbos_tree(html, 'KTEB', set())
+    regex_fbos = scraper._parse_fbos_regex(html, 'KTEB', set())
+
+    assert tree_fbos == regex_fbos
+    assert len(tree_fbos) == 2